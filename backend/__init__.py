@@ -1 +1,7 @@
 # Backend package initialization
+import pandas as pd
+
+# Copy-on-Write turns column selections and filters into lazy copies, so the
+# pipeline doesn't need defensive .copy() calls (always on from pandas 3.0)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
@@ -2,8 +2,9 @@
 API endpoints for dashboard data.
 """
 from fastapi import APIRouter, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
 from typing import List, Dict, Any, Optional
+import orjson
 import logging
 import asyncio
 from datetime import datetime, timedelta
@@ -32,6 +33,34 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter(prefix="/api", tags=["dashboard"])
 
+# orjson writes NaN/inf as null by default; these options allow non-str dict keys
+# and serialize numpy scalars/arrays natively
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def encode_json(content: Any) -> bytes:
+    """
+    Encode content as JSON with orjson.
+    
+    Args:
+        content: Data to encode
+        
+    Returns:
+        bytes: UTF-8 encoded JSON
+    """
+    return orjson.dumps(content, default=str, option=ORJSON_OPTIONS)
+
+def json_response(content: Any) -> Response:
+    """
+    Build a JSON response encoded with orjson instead of the stdlib encoder.
+    
+    Args:
+        content: Data to return
+        
+    Returns:
+        Response: application/json response
+    """
+    return Response(content=encode_json(content), media_type="application/json")
+
 # WebSocket connections manager
 class ConnectionManager:
     def __init__(self):
@@ -47,9 +76,11 @@ class ConnectionManager:
         logger.info(f"WebSocket client disconnected. Remaining connections: {len(self.active_connections)}")
     
     async def broadcast(self, message: Dict[str, Any]):
+        # Encode once for all clients instead of once per connection
+        text = encode_json(message).decode()
         for connection in self.active_connections:
             try:
-                await connection.send_json(message)
+                await connection.send_text(text)
             except Exception as e:
                 logger.error(f"Error broadcasting to WebSocket: {str(e)}")
 
@@ -66,11 +97,11 @@ async def dashboard():
     try:
         data = get_dashboard_data()
         # Ensure data is JSON serializable
-        if isinstance(data, dict) and data.any():
-            return JSONResponse(content=data)
+        if isinstance(data, dict) and data:
+            return json_response(data)
         else:
             logger.warning("Dashboard data is empty or not a dictionary")
-            return JSONResponse(content={})
+            return json_response({})
     except Exception as e:
         logger.error(f"Error retrieving dashboard data: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -89,11 +120,11 @@ async def users(active_only: bool = Query(False)):
     try:
         data = get_user_activity(active_only)
         # Ensure data is JSON serializable
-        if isinstance(data, list) and data.any():
-            return JSONResponse(content=data)
+        if isinstance(data, list) and data:
+            return json_response(data)
         else:
-            logger.warning("User activity data is not a list")
-            return JSONResponse(content=[])
+            logger.warning("User activity data is empty or not a list")
+            return json_response([])
     except Exception as e:
         logger.error(f"Error retrieving user activity data: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -113,11 +144,11 @@ async def progress(delivery_id: Optional[str] = None, user_id: Optional[str] = N
     try:
         data = get_delivery_progress(delivery_id, user_id)
         # Ensure data is JSON serializable
-        if isinstance(data, list) and data.any():
-            return JSONResponse(content=data)
+        if isinstance(data, list) and data:
+            return json_response(data)
         else:
-            logger.warning("Delivery progress data is not a list")
-            return JSONResponse(content=[])
+            logger.warning("Delivery progress data is empty or not a list")
+            return json_response([])
     except Exception as e:
         logger.error(f"Error retrieving delivery progress data: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -136,11 +167,11 @@ async def scan_times(user_id: Optional[str] = None):
     try:
         data = get_scan_times(user_id)
         # Ensure data is JSON serializable
-        if isinstance(data, list) and data.any():
-            return JSONResponse(content=data)
+        if isinstance(data, list) and data:
+            return json_response(data)
         else:
-            logger.warning("Scan time data is not a list")
-            return JSONResponse(content=[])
+            logger.warning("Scan time data is empty or not a list")
+            return json_response([])
     except Exception as e:
         logger.error(f"Error retrieving scan time data: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -174,11 +205,11 @@ async def websocket_endpoint(websocket: WebSocket):
         # Send initial data
         initial_data = get_dashboard_data()
         # Ensure data is JSON serializable
-        if isinstance(initial_data, dict) and initial_data.any():
-            await websocket.send_json({"type": "initial", "data": initial_data})
+        if isinstance(initial_data, dict) and initial_data:
+            await websocket.send_text(encode_json({"type": "initial", "data": initial_data}).decode())
         else:
-            logger.warning("Initial dashboard data is not a dictionary")
-            await websocket.send_json({"type": "initial", "data": {}})
+            logger.warning("Initial dashboard data is empty or not a dictionary")
+            await websocket.send_text(encode_json({"type": "initial", "data": {}}).decode())
         
         # Start sending real-time updates
         while True:
@@ -187,7 +218,7 @@ async def websocket_endpoint(websocket: WebSocket):
             
             # Check if updates is a dictionary and not empty
             has_updates = False
-            if isinstance(updates, dict) and updates.any():
+            if isinstance(updates, dict) and updates:
                 # Check if any value in the dictionary is truthy
                 for key, value in updates.items():
                     # Handle numpy arrays or pandas Series
@@ -202,7 +233,7 @@ async def websocket_endpoint(websocket: WebSocket):
             
             # Send updates if there are any
             if has_updates:
-                await websocket.send_json({"type": "update", "data": updates})
+                await websocket.send_text(encode_json({"type": "update", "data": updates}).decode())
             
             # Wait for the next update interval
             await asyncio.sleep(FRONTEND_UPDATE_INTERVAL)
@@ -224,7 +255,7 @@ async def broadcast_updates():
             
             # Check if updates is a dictionary and not empty
             has_updates = False
-            if isinstance(updates, dict) and updates.any():
+            if isinstance(updates, dict) and updates:
                 # Check if any value in the dictionary is truthy
                 for key, value in updates.items():
                     # Handle numpy arrays or pandas Series
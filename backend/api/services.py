@@ -56,12 +56,12 @@ def sanitize_for_json(data):
     elif isinstance(data, np.ndarray):
         # Handle numpy arrays by converting to a list and sanitizing each item
         return [sanitize_for_json(item) for item in data.tolist()]
-    elif pd.isna(data) or (hasattr(data, 'is_nan') and data.is_nan()):
-        return None
     elif isinstance(data, dict):
         return {k: sanitize_for_json(v) for k, v in data.items()}
     elif isinstance(data, (list, tuple)):
         return [sanitize_for_json(item) for item in data]
+    elif pd.isna(data) or (hasattr(data, 'is_nan') and data.is_nan()):
+        return None
     else:
         # Convert anything else to string
         try:
@@ -100,6 +100,37 @@ def get_dashboard_data() -> Dict[str, Any]:
     
     return sanitized_data
 
+def parse_local_timestamps(values: List[Any]) -> pd.Series:
+    """
+    Parse timestamps into naive local time, so they compare with datetime.now().
+    
+    Naive values are taken as local time; tz-aware ones are converted to local
+    time. Missing or unparseable values become NaT.
+    
+    Args:
+        values (list): Timestamps as ISO strings, datetimes or None
+        
+    Returns:
+        pandas.Series: datetime64 Series of naive local times
+    """
+    local_tz = datetime.now().astimezone().tzinfo
+    try:
+        parsed = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', format='ISO8601')
+    except (TypeError, ValueError):
+        # Naive and tz-aware values (or different offsets) can't share one dtype,
+        # so fall back to parsing them one by one
+        timestamps = []
+        for value in values:
+            ts = pd.to_datetime(value, errors='coerce')
+            if not pd.isna(ts) and ts.tzinfo is not None:
+                ts = ts.tz_convert(local_tz).tz_localize(None)
+            timestamps.append(ts)
+        return pd.to_datetime(pd.Series(timestamps, dtype=object), errors='coerce')
+    
+    if parsed.dt.tz is not None:
+        parsed = parsed.dt.tz_convert(local_tz).dt.tz_localize(None)
+    return parsed
+
 def get_user_activity(active_only: bool = False) -> List[Dict[str, Any]]:
     """
     Get user activity data.
@@ -122,17 +153,11 @@ def get_user_activity(active_only: bool = False) -> List[Dict[str, Any]]:
         # Consider a user active if their last scan was within the window
         cutoff_time = datetime.now() - timedelta(minutes=WINDOW_MINUTES)
         
-        # Convert string timestamps to datetime for comparison
-        active_users = []
-        for user in users_data:
-            if 'last_scan' in user:
-                try:
-                    last_scan = datetime.fromisoformat(user['last_scan'])
-                    if last_scan >= cutoff_time:
-                        active_users.append(user)
-                except (ValueError, TypeError):
-                    # If we can't parse the timestamp, skip this user
-                    pass
+        # Parse all last_scan values together and compare them to the cutoff at
+        # once; missing or unparseable timestamps become NaT and never count as active
+        last_scans = parse_local_timestamps([user.get('last_scan') for user in users_data])
+        is_active = (last_scans >= cutoff_time).to_numpy()
+        active_users = [user for user, active in zip(users_data, is_active) if active]
         
         # Sanitize data for JSON serialization
         sanitized_data = sanitize_for_json(active_users)
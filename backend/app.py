@@ -16,11 +16,11 @@ from datetime import datetime
 # Add the project root to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from backend.api.routes import router as api_router, broadcast_updates
-from backend.data_processing.readers import get_combined_data
+from backend.data_processing.readers import get_combined_data, reset_read_pool
 from backend.data_processing.transformers import prepare_dashboard_data
-from backend.data_processing.watchers import poll_for_new_files
+from backend.data_processing.watchers import poll_for_new_files, get_latest_files
 from backend.storage.cache import dashboard_cache
-from backend.storage.parquet_manager import save_dashboard_data_to_parquet, diff_dashboard_data
+from backend.storage.parquet_manager import save_dashboard_data_to_parquet, diff_dashboard_data, get_previous_dashboard_data
 from config import INTERVAL_SECONDS
 
 # Set up logging
@@ -50,15 +50,23 @@ app.add_middleware(
 app.include_router(api_router)
 
 # Background task for processing files
-def process_files():
+def process_files(known_files=None):
     """
     Process the latest ZMDESNR and VL06O files and update the dashboard data.
+    
+    Args:
+        known_files (dict, optional): Paths of files that are already known, by type
+            ('zmdesnr' and/or 'vl06o'), so their directories don't need to be searched again
     """
     logger.info("Processing latest files...")
     
     try:
-        # Get the combined data
-        serials_df, deliveries_df, combined_df = get_combined_data()
+        # Get the combined data, reusing the paths of newly detected files
+        known_files = known_files or {}
+        serials_df, deliveries_df, combined_df = get_combined_data(
+            zmdesnr_file=known_files.get('zmdesnr'),
+            vl06o_file=known_files.get('vl06o')
+        )
         
         if serials_df.empty or deliveries_df.empty:
             logger.warning("One or both dataframes are empty")
@@ -68,20 +76,24 @@ def process_files():
         dashboard_data = prepare_dashboard_data(combined_df)
         
         # Generate timestamp for file naming
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        now = datetime.now()
+        timestamp = now.strftime("%Y%m%d%H%M%S")
+        
+        # Get previous dashboard data (cache, or the latest Parquet snapshot)
+        previous_data = get_previous_dashboard_data()
         
-        # Get previous dashboard data from cache
-        previous_data = dashboard_cache.get('previous_dashboard_data', {})
+        # Collect all cache changes so the cache file is written only once
+        cache_updates = {
+            'dashboard_data': dashboard_data,
+            'last_update_time': now.isoformat()
+        }
         
         # Calculate diff with previous data
         if previous_data:
-            diff = diff_dashboard_data(dashboard_data, previous_data)
-            dashboard_cache.set('latest_diff', diff)
+            cache_updates['latest_diff'] = diff_dashboard_data(dashboard_data, previous_data)
         
         # Update the cache with the new dashboard data
-        dashboard_cache.set_dashboard_data(dashboard_data)
-        dashboard_cache.set('previous_dashboard_data', dashboard_data)
-        dashboard_cache.set('last_update_time', datetime.now().isoformat())
+        dashboard_cache.update(cache_updates)
         
         # Save the dashboard data to Parquet files
         save_dashboard_data_to_parquet(dashboard_data, timestamp)
@@ -92,26 +104,29 @@ def process_files():
         logger.error(f"Error processing files: {str(e)}")
 
 # File change callback
-def file_change_callback(file_type, file_path):
+def file_change_callback(new_files):
     """
     Handle updates when new files are detected.
     
     Args:
-        file_type (str): Type of file ('zmdesnr' or 'vl06o')
-        file_path (str): Path to the new file
+        new_files (dict): New file paths by file type ('zmdesnr' and/or 'vl06o')
     """
-    logger.info(f"New {file_type.upper()} file detected: {file_path}")
+    for file_type, file_path in new_files.items():
+        logger.info(f"New {file_type.upper()} file detected: {file_path}")
     
-    # Process the files and update the dashboard data
-    process_files()
+    # Process the files once for all of them and update the dashboard data
+    process_files(new_files)
 
 # Background task for file watching
-def start_file_watcher():
+def start_file_watcher(last_processed=None):
     """
     Start watching for file changes in a background thread.
+    
+    Args:
+        last_processed (dict, optional): Latest files that were already processed
     """
     logger.info("Starting file watcher...")
-    poll_for_new_files(file_change_callback, INTERVAL_SECONDS)
+    poll_for_new_files(file_change_callback, INTERVAL_SECONDS, last_processed)
 
 # Startup event
 @app.on_event("startup")
@@ -121,11 +136,15 @@ async def startup_event():
     """
     logger.info("Starting Delivery Dashboard API...")
     
-    # Process files initially
-    process_files()
+    # Process files initially. The latest files are looked up once and used for
+    # both the initial processing and the watcher's starting point, so the
+    # watcher's first poll doesn't process the same files again (a file that
+    # arrives in between is still picked up by the watcher)
+    latest_files = get_latest_files()
+    process_files(latest_files)
     
     # Start file watcher in a background thread
-    watcher_thread = threading.Thread(target=start_file_watcher, daemon=True)
+    watcher_thread = threading.Thread(target=start_file_watcher, args=(latest_files,), daemon=True)
     watcher_thread.start()
     
     # Start the WebSocket broadcast task
@@ -138,6 +157,7 @@ async def shutdown_event():
     Run cleanup tasks when the application shuts down.
     """
     logger.info("Shutting down Delivery Dashboard API...")
+    reset_read_pool()
 
 # Root endpoint
 @app.get("/")
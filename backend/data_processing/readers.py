@@ -3,14 +3,19 @@ File readers for ZMDESNR and VL06O Excel files.
 """
 import os
 import pandas as pd
-import glob
-from datetime import datetime
+import numpy as np
+import fnmatch
+import tempfile
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from datetime import datetime, time, timedelta
 import sys
 import logging
 
 # Add the project root to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-from config import SERIAL_NUMBERS_DIR, DELIVERY_INFO_DIR, WAREHOUSE_FILTER
+from config import SERIAL_NUMBERS_DIR, DELIVERY_INFO_DIR, WAREHOUSE_FILTER, OUT_DIR
 
 # Set up logging
 logging.basicConfig(
@@ -19,6 +24,59 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Columns (after sanitizing) that the pipeline reads from each report
+ZMDESNR_COLUMNS = ['serial_number', 'created_by', 'created_on', 'time', 'delivery',
+                   'status', 'warehouse_number', 'pallet', 'name']
+VL06O_COLUMNS = ['delivery', 'number_of_packages', 'shipping_point']
+
+# Processed DataFrames of the last file read per report type,
+# keyed by file signature, so unchanged files aren't read again
+_processed_files = {}
+
+# Seconds to wait for a file read in the worker pool before reading in-process instead
+PARALLEL_READ_TIMEOUT = 300
+
+# Worker pool for reading both reports in parallel, created on first use and kept
+# for the life of the process. Workers are spawned rather than forked so they
+# don't inherit locks held by the server's threads.
+_read_pool = None
+_read_pool_lock = threading.Lock()
+
+# Parquet copies of Excel files that have already been parsed
+EXCEL_CACHE_DIR = os.path.join(OUT_DIR, 'excel_cache')
+
+# Character replacements applied to headers, done in a single translate pass
+_HEADER_TRANSLATION = str.maketrans({' ': '_', '#': 'number', '/': '_'})
+
+def sanitize_header(name):
+    """
+    Sanitize a single header name the same way sanitize_headers does.
+    
+    Args:
+        name: Header name
+        
+    Returns:
+        str: Sanitized header name
+    """
+    return str(name).lower().translate(_HEADER_TRANSLATION)
+
+def make_usecols(column_mapping, columns):
+    """
+    Build a usecols filter that keeps only the columns the pipeline uses.
+    
+    A header is kept if it is a key of column_mapping, or if its sanitized
+    name is in columns, so slightly different header spellings still match.
+    
+    Args:
+        column_mapping (dict): Excel header -> column name mapping
+        columns (iterable): Sanitized column names to keep
+        
+    Returns:
+        callable: Function suitable for pandas.read_excel(usecols=...)
+    """
+    wanted = set(columns) | set(column_mapping.values())
+    return lambda name: name in column_mapping or sanitize_header(name) in wanted
+
 def sanitize_headers(df):
     """
     Sanitize DataFrame headers to ensure consistency.
@@ -30,13 +88,184 @@ def sanitize_headers(df):
         pandas.DataFrame: DataFrame with sanitized headers
     """
     # Convert headers to lowercase and replace spaces with underscores
-    df.columns = df.columns.str.lower().str.replace(' ', '_').str.replace('#', 'number').str.replace('/', '_')
+    df.columns = df.columns.str.lower().str.translate(_HEADER_TRANSLATION)
+    return df
+
+def get_excel_cache_prefix(file_path):
+    """
+    Get the filename prefix shared by all Parquet copies of an Excel file.
+    
+    Args:
+        file_path (str): Path to the Excel file
+        
+    Returns:
+        str: Filename prefix inside EXCEL_CACHE_DIR
+    """
+    parent = os.path.basename(os.path.dirname(os.path.abspath(file_path)))
+    return f"{parent}_{os.path.basename(file_path)}."
+
+def get_excel_cache_path(file_path, stat):
+    """
+    Get the path of the Parquet copy of a specific version of an Excel file.
+    
+    The source mtime (in ns) and size are part of the name, so a replaced file
+    never matches an old copy, even if its mtime went backwards.
+    
+    Args:
+        file_path (str): Path to the Excel file
+        stat (os.stat_result): Stat result of the Excel file
+        
+    Returns:
+        str: Path to the Parquet cache file
+    """
+    return os.path.join(
+        EXCEL_CACHE_DIR,
+        f"{get_excel_cache_prefix(file_path)}{stat.st_mtime_ns}.{stat.st_size}.parquet"
+    )
+
+def prune_excel_cache(file_paths):
+    """
+    Remove every Parquet copy in EXCEL_CACHE_DIR except those of the given files.
+    
+    Each new report arrives under a new name, so copies are kept only for the
+    current version of the files in use and everything else is deleted.
+    
+    Args:
+        file_paths (list): Paths to the Excel files currently in use
+    """
+    keep_names = set()
+    for file_path in file_paths:
+        try:
+            keep_names.add(os.path.basename(get_excel_cache_path(file_path, os.stat(file_path))))
+        except (OSError, TypeError):
+            continue
+    
+    try:
+        with os.scandir(EXCEL_CACHE_DIR) as entries:
+            stale = [entry.path for entry in entries if entry.is_file() and entry.name not in keep_names]
+        for path in stale:
+            os.remove(path)
+    except FileNotFoundError:
+        # Nothing cached yet
+        pass
+    except OSError as e:
+        logger.warning(f"Error removing old cached Excel copies: {str(e)}")
+
+def read_excel_file(file_path, usecols=None):
+    """
+    Read an Excel file, preferring the calamine engine.
+    
+    The Rust-based calamine reader is much faster than openpyxl on large
+    sheets. If python-calamine is not installed (or pandas is too old to
+    know the engine), fall back to openpyxl.
+    
+    The result is also written to a Parquet copy in EXCEL_CACHE_DIR, keyed by
+    the file's mtime and size, so an unchanged file (e.g. the VL06O file when
+    only a new ZMDESNR file arrived) is loaded from Parquet on the next read.
+    
+    Args:
+        file_path (str): Path to the Excel file
+        usecols (callable, optional): Called with each header name; only columns
+            for which it returns True are read. If None, all columns are read.
+        
+    Returns:
+        pandas.DataFrame: Contents of the first sheet
+    """
+    cache_path = get_excel_cache_path(file_path, os.stat(file_path))
+    
+    # Just try to open the copy; a missing one is the normal first-read case
+    try:
+        df = pd.read_parquet(cache_path, engine='pyarrow')
+        logger.info(f"Loaded cached copy of {file_path}")
+        if usecols is not None:
+            df = df[[col for col in df.columns if usecols(col)]]
+        return df
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Error reading cached copy {cache_path}: {str(e)}")
+    
+    try:
+        df = pd.read_excel(file_path, engine='calamine', usecols=usecols)
+    except (ImportError, ValueError) as e:
+        logger.debug(f"Calamine engine unavailable, falling back to openpyxl: {str(e)}")
+        df = pd.read_excel(file_path, engine='openpyxl', usecols=usecols)
+    
+    try:
+        os.makedirs(EXCEL_CACHE_DIR, exist_ok=True)
+        # A unique temporary file per writer: an abandoned worker may still be
+        # writing the same copy (see reset_read_pool)
+        fd, temp_path = tempfile.mkstemp(dir=EXCEL_CACHE_DIR, prefix=os.path.basename(cache_path) + '.', suffix='.tmp')
+        os.close(fd)
+        try:
+            df.to_parquet(temp_path, engine='pyarrow', compression='zstd')
+            os.replace(temp_path, cache_path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+    except Exception as e:
+        # Mixed-type columns can't always be stored; just skip the cache
+        logger.warning(f"Could not cache {file_path} as Parquet: {str(e)}")
+    
     return df
 
+def parse_time_of_day(time_col):
+    """
+    Convert a time-of-day column to timedeltas since midnight.
+    
+    Handles datetime64 columns, datetime.time objects and time strings such as
+    "13:05:00", "9:23" or "1:05:00 PM" without a per-row Python call, so the
+    result can be added to a date column.
+    
+    Args:
+        time_col (pandas.Series): Column with time-of-day values
+        
+    Returns:
+        pandas.Series: timedelta64 Series (NaT where the value can't be parsed)
+    """
+    if pd.api.types.is_timedelta64_dtype(time_col):
+        return time_col
+    if pd.api.types.is_datetime64_any_dtype(time_col):
+        return time_col - time_col.dt.normalize()
+    # Scan times repeat heavily, so only the distinct values are parsed and the
+    # result is mapped back through the factorized codes (-1 for missing -> NaT)
+    codes, uniques = pd.factorize(time_col)
+    uniques = pd.Index(uniques, dtype=object)
+    parsed = pd.Series(pd.NaT, index=range(len(uniques)), dtype='timedelta64[ns]')
+    
+    # time/timedelta objects print as "HH:MM:SS", which to_timedelta reads directly;
+    # strings may use AM/PM or omit seconds, so they are parsed as datetimes
+    # and the date part is dropped again
+    is_clock = np.array([isinstance(v, (time, timedelta)) for v in uniques], dtype=bool)
+    if is_clock.any():
+        parsed[is_clock] = pd.to_timedelta(uniques[is_clock].astype(str), errors='coerce')
+    if (~is_clock).any():
+        as_datetime = pd.to_datetime(uniques[~is_clock], format='mixed', errors='coerce')
+        parsed[~is_clock] = as_datetime - as_datetime.normalize()
+    
+    return pd.Series(pd.Index(parsed).take(codes, fill_value=pd.NaT), index=time_col.index)
+
+def combine_date_and_time(created_on, time_col):
+    """
+    Build scan timestamps from a date column and a time-of-day column.
+    
+    Args:
+        created_on (pandas.Series): datetime64 column whose date part is used
+        time_col (pandas.Series): Column with time-of-day values (see parse_time_of_day)
+        
+    Returns:
+        pandas.Series: datetime64 Series (NaT where either part is missing)
+    """
+    return created_on.dt.normalize() + parse_time_of_day(time_col)
+
 def get_latest_file(directory, pattern="*.xlsx"):
     """
     Get the most recent file in a directory matching the pattern.
     
+    Uses a single os.scandir pass and the stat cached on each DirEntry,
+    instead of listing with glob and stat'ing every match again. Excel lock
+    files (~$name.xlsx) are skipped.
+    
     Args:
         directory (str): Directory to search
         pattern (str): File pattern to match
@@ -44,13 +273,22 @@ def get_latest_file(directory, pattern="*.xlsx"):
     Returns:
         str: Path to the most recent file, or None if no files found
     """
-    files = glob.glob(os.path.join(directory, pattern))
-    if not files:
+    try:
+        with os.scandir(directory) as entries:
+            # Pick the most recently modified file while scanning
+            latest = max(
+                (
+                    entry for entry in entries
+                    if not entry.name.startswith('~$') and fnmatch.fnmatch(entry.name, pattern) and entry.is_file()
+                ),
+                key=lambda entry: entry.stat().st_mtime,
+                default=None
+            )
+    except OSError as e:
+        logger.error(f"Error scanning directory {directory}: {str(e)}")
         return None
     
-    # Sort files by modification time (most recent first)
-    files.sort(key=os.path.getmtime, reverse=True)
-    return files[0]
+    return latest.path if latest is not None else None
 
 def read_zmdesnr_file(file_path=None):
     """
@@ -71,12 +309,6 @@ def read_zmdesnr_file(file_path=None):
     logger.info(f"Reading ZMDESNR file: {file_path}")
     
     try:
-        # Read the Excel file
-        df = pd.read_excel(file_path)
-        
-        # Log the original columns for debugging
-        logger.info(f"Original columns in ZMDESNR file: {df.columns.tolist()}")
-        
         # Rename columns directly instead of creating new ones
         column_mapping = {
             'Serial #': 'serial_number',
@@ -87,6 +319,13 @@ def read_zmdesnr_file(file_path=None):
             'Warehouse Number': 'warehouse_number'
         }
         
+        # Read the Excel file, skipping columns that aren't used downstream
+        df = read_excel_file(file_path, usecols=make_usecols(column_mapping, ZMDESNR_COLUMNS))
+        
+        # Log the original columns for debugging (only build the list when it is emitted)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Original columns in ZMDESNR file: {df.columns.tolist()}")
+        
         # Rename columns that exist in the DataFrame
         df = df.rename(columns={k: v for k, v in column_mapping.items() if k in df.columns})
         
@@ -94,15 +333,17 @@ def read_zmdesnr_file(file_path=None):
         df = sanitize_headers(df)
         
         # Log the columns after mapping and sanitizing
-        logger.info(f"Columns after mapping and sanitizing: {df.columns.tolist()}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Columns after mapping and sanitizing: {df.columns.tolist()}")
         
-        # Filter for warehouse
+        # Filter for warehouse and for pallets (where pallet column is 1),
+        # combining the masks so the frame is only filtered once
+        keep = pd.Series(True, index=df.index)
         if 'warehouse_number' in df.columns:
-            df = df[df['warehouse_number'] == WAREHOUSE_FILTER]
-        
-        # Filter for pallets (where pallet column is 1)
+            keep &= df['warehouse_number'] == WAREHOUSE_FILTER
         if 'pallet' in df.columns:
-            df = df[df['pallet'] == 1]
+            keep &= df['pallet'] == 1
+        df = df[keep]
         
         # Convert timestamp columns if needed
         if 'created_on' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['created_on']):
@@ -111,18 +352,7 @@ def read_zmdesnr_file(file_path=None):
         # Create scan_timestamp from time and created_on if they exist
         if 'time' in df.columns and 'created_on' in df.columns:
             try:
-                # Convert time to string if it's not already
-                if not pd.api.types.is_object_dtype(df['time']):
-                    # If time is a datetime.time object, convert to string
-                    df['time_str'] = df['time'].apply(lambda x: x.strftime('%H:%M:%S') if hasattr(x, 'strftime') else str(x))
-                else:
-                    df['time_str'] = df['time']
-                
-                # Create scan_timestamp by combining date from created_on and time_str
-                df['scan_timestamp'] = pd.to_datetime(
-                    df['created_on'].dt.strftime('%Y-%m-%d') + ' ' + df['time_str'], 
-                    errors='coerce'
-                )
+                df['scan_timestamp'] = combine_date_and_time(df['created_on'], df['time'])
                 
                 logger.info(f"Created scan_timestamp column from time and created_on")
             except Exception as e:
@@ -167,12 +397,6 @@ def read_vl06o_file(file_path=None):
     logger.info(f"Reading VL06O file: {file_path}")
     
     try:
-        # Read the Excel file
-        df = pd.read_excel(file_path)
-        
-        # Log the original columns for debugging
-        logger.info(f"Original columns in VL06O file: {df.columns.tolist()}")
-        
         # Rename columns directly instead of creating new ones
         column_mapping = {
             'Delivery': 'delivery',
@@ -180,6 +404,13 @@ def read_vl06o_file(file_path=None):
             'Shipping Point/Receiving Pt': 'shipping_point'
         }
         
+        # Read the Excel file, skipping columns that aren't used downstream
+        df = read_excel_file(file_path, usecols=make_usecols(column_mapping, VL06O_COLUMNS))
+        
+        # Log the original columns for debugging (only build the list when it is emitted)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Original columns in VL06O file: {df.columns.tolist()}")
+        
         # Rename columns that exist in the DataFrame
         df = df.rename(columns={k: v for k, v in column_mapping.items() if k in df.columns})
         
@@ -187,7 +418,8 @@ def read_vl06o_file(file_path=None):
         df = sanitize_headers(df)
         
         # Log the columns after mapping and sanitizing
-        logger.info(f"Columns after mapping and sanitizing: {df.columns.tolist()}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Columns after mapping and sanitizing: {df.columns.tolist()}")
         
         # Drop the first row if it's all NaN (header row)
         if not df.empty and df.iloc[0].isna().all():
@@ -203,20 +435,140 @@ def read_vl06o_file(file_path=None):
         logger.error(f"Error reading VL06O file {file_path}: {str(e)}")
         return pd.DataFrame()
 
-def get_combined_data():
+def normalize_delivery_numbers(deliveries):
+    """
+    Normalize delivery numbers to strings without decimal points.
+    
+    Serials repeat the same delivery on many rows, so the conversion is done
+    on the unique values only and mapped back through the factorized codes.
+    
+    Args:
+        deliveries (pandas.Series): Delivery numbers (numeric or numeric strings)
+        
+    Returns:
+        pandas.Series: Delivery numbers as strings, missing values as '0'
+    """
+    codes, uniques = pd.factorize(deliveries.fillna(0))
+    normalized = pd.Index(uniques).astype(int).astype(str)
+    return pd.Series(normalized.take(codes), index=deliveries.index)
+
+def get_file_signature(file_path):
+    """
+    Get a signature that changes whenever a file is replaced or rewritten.
+    
+    Uses the integer mtime in nanoseconds, like the Excel cache file names,
+    so both agree on whether a file changed.
+    
+    Args:
+        file_path (str): Path to the file
+        
+    Returns:
+        tuple: (path, mtime_ns, size), or None if the file can't be stat'ed
+    """
+    if file_path is None:
+        return None
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (file_path, stat.st_mtime_ns, stat.st_size)
+
+def get_read_pool():
+    """
+    Get the long-lived process pool used to read both report files in parallel.
+    
+    Returns:
+        concurrent.futures.ProcessPoolExecutor: The shared pool
+    """
+    global _read_pool
+    with _read_pool_lock:
+        if _read_pool is None:
+            _read_pool = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn'))
+        return _read_pool
+
+def reset_read_pool():
+    """
+    Shut down the shared read pool so the next parallel read starts a fresh one.
+    
+    Used after a read timed out or a worker died. Queued reads are cancelled,
+    but a read that is already running is abandoned, not cancelled: its worker
+    finishes in the background and its result is discarded. Cache files are
+    written through unique temporary files, so it can't clash with the
+    sequential re-read of the same file.
+    """
+    global _read_pool
+    with _read_pool_lock:
+        if _read_pool is not None:
+            _read_pool.shutdown(wait=False, cancel_futures=True)
+            _read_pool = None
+
+def get_combined_data(zmdesnr_file=None, vl06o_file=None):
     """
     Combine data from ZMDESNR and VL06O files.
     
+    Args:
+        zmdesnr_file (str, optional): Path to the ZMDESNR file. If None, uses the most recent file.
+        vl06o_file (str, optional): Path to the VL06O file. If None, uses the most recent file.
+        
     Returns:
         tuple: (serials_df, deliveries_df, combined_df)
     """
-    # Read the latest files
-    serials_df = read_zmdesnr_file()
-    deliveries_df = read_vl06o_file()
+    # Resolve the files here so unchanged ones can be served from memory
+    if zmdesnr_file is None:
+        zmdesnr_file = get_latest_file(SERIAL_NUMBERS_DIR)
+    if vl06o_file is None:
+        vl06o_file = get_latest_file(DELIVERY_INFO_DIR)
+    
+    readers = {
+        'zmdesnr': (read_zmdesnr_file, zmdesnr_file),
+        'vl06o': (read_vl06o_file, vl06o_file)
+    }
+    
+    results = {}
+    pending = {}
+    for file_type, (reader, file_path) in readers.items():
+        signature = get_file_signature(file_path)
+        cached = _processed_files.get(file_type)
+        if signature is not None and cached is not None and cached[0] == signature:
+            logger.info(f"Reusing processed {file_type.upper()} data for unchanged file: {file_path}")
+            # Shallow copy: with Copy-on-Write, changes to it never reach the cached frame
+            results[file_type] = cached[1].copy(deep=False)
+        else:
+            pending[file_type] = (reader, file_path, signature)
+    
+    if len(pending) > 1:
+        # Read the files in parallel; parsing Excel is CPU-bound, so use processes
+        try:
+            executor = get_read_pool()
+            futures = {
+                file_type: executor.submit(reader, file_path)
+                for file_type, (reader, file_path, _) in pending.items()
+            }
+            for file_type, future in futures.items():
+                results[file_type] = future.result(timeout=PARALLEL_READ_TIMEOUT)
+        except FuturesTimeoutError:
+            logger.warning(f"Parallel file read took longer than {PARALLEL_READ_TIMEOUT}s, reading files sequentially")
+            reset_read_pool()
+        except Exception as e:
+            logger.warning(f"Parallel file read failed, reading files sequentially: {str(e)}")
+            reset_read_pool()
+    
+    for file_type, (reader, file_path, signature) in pending.items():
+        if file_type not in results:
+            results[file_type] = reader(file_path)
+        if signature is not None and not results[file_type].empty:
+            _processed_files[file_type] = (signature, results[file_type].copy(deep=False))
+    
+    if pending:
+        prune_excel_cache([zmdesnr_file, vl06o_file])
+    
+    serials_df = results['zmdesnr']
+    deliveries_df = results['vl06o']
     
     # Log the columns in each dataframe
-    logger.info(f"Serials DataFrame columns: {serials_df.columns.tolist()}")
-    logger.info(f"Deliveries DataFrame columns: {deliveries_df.columns.tolist()}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Serials DataFrame columns: {serials_df.columns.tolist()}")
+        logger.debug(f"Deliveries DataFrame columns: {deliveries_df.columns.tolist()}")
     
     if serials_df.empty or deliveries_df.empty:
         logger.warning("One or both dataframes are empty")
@@ -241,22 +593,30 @@ def get_combined_data():
     # Ensure delivery column is of the same type in both dataframes
     if delivery_col_serials and delivery_col_deliveries:
         # Convert to integers first to remove decimal points, then to strings
-        serials_df['delivery'] = serials_df[delivery_col_serials].fillna(0).astype(int).astype(str)
-        deliveries_df['delivery'] = deliveries_df[delivery_col_deliveries].fillna(0).astype(int).astype(str)
+        serials_df['delivery'] = normalize_delivery_numbers(serials_df[delivery_col_serials])
+        deliveries_df['delivery'] = normalize_delivery_numbers(deliveries_df[delivery_col_deliveries])
         
         # Ensure number_of_packages column exists in deliveries_df
         if 'number_of_packages' not in deliveries_df.columns and 'Number of packages' in deliveries_df.columns:
             deliveries_df['number_of_packages'] = deliveries_df['Number of packages']
             logger.info("Using 'Number of packages' column as 'number_of_packages'")
         
-        # Merge the dataframes on delivery
-        combined_df = pd.merge(
-            serials_df,
-            deliveries_df,
+        # VL06O should have one row per delivery; a repeated delivery would
+        # duplicate every one of its serials in the merge
+        unique_deliveries_df = deliveries_df.drop_duplicates('delivery')
+        if len(unique_deliveries_df) < len(deliveries_df):
+            logger.warning(f"Ignoring {len(deliveries_df) - len(unique_deliveries_df)} duplicate delivery rows in VL06O data")
+        
+        # Join the deliveries on their delivery index (a hash probe per serial);
+        # validate guards against the one-to-many blow-up
+        combined_df = serials_df.join(
+            unique_deliveries_df.set_index('delivery'),
             on='delivery',
             how='inner',
-            suffixes=('_serial', '_delivery')
-        )
+            lsuffix='_serial',
+            rsuffix='_delivery',
+            validate='many_to_one'
+        ).reset_index(drop=True)
         
         # Log the number of rows in the combined dataframe
         logger.info(f"Combined DataFrame: {len(combined_df)} rows")
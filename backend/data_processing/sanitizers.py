@@ -12,53 +12,59 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Characters that are not allowed in standardized column names
+_INVALID_COLUMN_CHARS = re.compile(r'[^a-zA-Z0-9_]')
+
+# Common column name variations mapped to standard names
+_COLUMN_MAPPING = {
+    'serialnumber': 'serial_number',
+    'serial_': 'serial_number',
+    'serialno': 'serial_number',
+    'serial': 'serial_number',
+    'deliverynumber': 'delivery',
+    'delivery_number': 'delivery',
+    'deliveryno': 'delivery',
+    'warehouse': 'warehouse_number',
+    'warehouseno': 'warehouse_number',
+    'warehouseid': 'warehouse_number',
+    'warehouse_id': 'warehouse_number',
+    'createdon': 'created_on',
+    'created_date': 'created_on',
+    'createdby': 'created_by',
+    'user': 'created_by',
+    'userid': 'created_by',
+    'user_id': 'created_by',
+    'numberofpackages': 'number_of_packages',
+    'package_count': 'number_of_packages',
+    'packages': 'number_of_packages',
+    'shippingpoint': 'shipping_point',
+    'shipping_pointreceiving_pt': 'shipping_point',
+}
+
 def standardize_column_names(df):
     """
     Standardize column names to a consistent format.
     
+    The DataFrame is modified in place; sanitize_dataframe makes the copy.
+    
     Args:
         df (pandas.DataFrame): DataFrame with columns to standardize
         
     Returns:
-        pandas.DataFrame: DataFrame with standardized column names
+        pandas.DataFrame: The same DataFrame with standardized column names
     """
-    # Make a copy to avoid modifying the original
-    df = df.copy()
-    
     # Convert to lowercase, replace spaces with underscores, and remove special characters
-    df.columns = [
-        re.sub(r'[^a-zA-Z0-9_]', '', col.lower().replace(' ', '_').replace('#', 'number').replace('/', '_'))
-        for col in df.columns
-    ]
-    
-    # Map common variations to standard names
-    column_mapping = {
-        'serialnumber': 'serial_number',
-        'serial_': 'serial_number',
-        'serialno': 'serial_number',
-        'serial': 'serial_number',
-        'deliverynumber': 'delivery',
-        'delivery_number': 'delivery',
-        'deliveryno': 'delivery',
-        'warehouse': 'warehouse_number',
-        'warehouseno': 'warehouse_number',
-        'warehouseid': 'warehouse_number',
-        'warehouse_id': 'warehouse_number',
-        'createdon': 'created_on',
-        'created_date': 'created_on',
-        'createdby': 'created_by',
-        'user': 'created_by',
-        'userid': 'created_by',
-        'user_id': 'created_by',
-        'numberofpackages': 'number_of_packages',
-        'package_count': 'number_of_packages',
-        'packages': 'number_of_packages',
-        'shippingpoint': 'shipping_point',
-        'shipping_pointreceiving_pt': 'shipping_point',
-    }
-    
-    # Apply the mapping where matches are found
-    df.columns = [column_mapping.get(col, col) for col in df.columns]
+    df.columns = (
+        df.columns.astype(str)
+        .str.lower()
+        .str.replace(' ', '_', regex=False)
+        .str.replace('#', 'number', regex=False)
+        .str.replace('/', '_', regex=False)
+        .str.replace(_INVALID_COLUMN_CHARS, '', regex=True)
+    )
+    
+    # Map common variations to standard names where matches are found
+    df.columns = [_COLUMN_MAPPING.get(col, col) for col in df.columns]
     
     return df
 
@@ -66,22 +72,24 @@ def clean_numeric_columns(df, columns):
     """
     Clean numeric columns by converting to appropriate numeric types.
     
+    The DataFrame is modified in place; sanitize_dataframe makes the copy.
+    
     Args:
         df (pandas.DataFrame): DataFrame with columns to clean
         columns (list): List of column names to clean
         
     Returns:
-        pandas.DataFrame: DataFrame with cleaned numeric columns
+        pandas.DataFrame: The same DataFrame with cleaned numeric columns
     """
-    df = df.copy()
+    present = [col for col in columns if col in df.columns]
+    if not present:
+        return df
     
-    for col in columns:
-        if col in df.columns:
-            try:
-                # Convert to numeric, coercing errors to NaN
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-            except Exception as e:
-                logger.warning(f"Error converting column {col} to numeric: {str(e)}")
+    try:
+        # Convert all columns in one batched call, coercing errors to NaN
+        df[present] = df[present].apply(pd.to_numeric, errors='coerce')
+    except Exception as e:
+        logger.warning(f"Error converting columns {present} to numeric: {str(e)}")
     
     return df
 
@@ -89,22 +97,25 @@ def clean_date_columns(df, columns):
     """
     Clean date columns by converting to datetime.
     
+    The DataFrame is modified in place; sanitize_dataframe makes the copy.
+    
     Args:
         df (pandas.DataFrame): DataFrame with columns to clean
         columns (list): List of column names to clean
         
     Returns:
-        pandas.DataFrame: DataFrame with cleaned date columns
+        pandas.DataFrame: The same DataFrame with cleaned date columns
     """
-    df = df.copy()
+    present = [col for col in columns if col in df.columns]
+    if not present:
+        return df
     
-    for col in columns:
-        if col in df.columns:
-            try:
-                # Convert to datetime, coercing errors to NaT
-                df[col] = pd.to_datetime(df[col], errors='coerce')
-            except Exception as e:
-                logger.warning(f"Error converting column {col} to datetime: {str(e)}")
+    try:
+        # Convert all columns in one batched call, coercing errors to NaT;
+        # cache=True parses each distinct date string only once
+        df[present] = df[present].apply(pd.to_datetime, errors='coerce', cache=True)
+    except Exception as e:
+        logger.warning(f"Error converting columns {present} to datetime: {str(e)}")
     
     return df
 
@@ -123,6 +134,9 @@ def sanitize_dataframe(df, numeric_columns=None, date_columns=None):
     if df.empty:
         return df
     
+    # Make a single copy to avoid modifying the original; the helpers work in place
+    df = df.copy()
+    
     # Standardize column names
     df = standardize_column_names(df)
     
@@ -3,6 +3,7 @@ Data transformation functions to extract required metrics.
 """
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import sys
 import os
@@ -11,7 +12,8 @@ import logging
 # Add the project root to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 from config import WAREHOUSE_FILTER, WINDOW_MINUTES, STATUS_MAPPING
-from backend.storage.cache import dashboard_cache
+from backend.storage.parquet_manager import get_previous_dashboard_data
+from backend.data_processing.readers import combine_date_and_time
 
 # Set up logging
 logging.basicConfig(
@@ -20,6 +22,65 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def ensure_datetime_column(df, column):
+    """
+    Convert a column to datetime in place, unless it already is one.
+    
+    Args:
+        df (pandas.DataFrame): DataFrame holding the column
+        column (str): Name of the column to convert
+        
+    Returns:
+        pandas.DataFrame: The same DataFrame
+    """
+    if column in df.columns and not pd.api.types.is_datetime64_any_dtype(df[column]):
+        df[column] = pd.to_datetime(df[column], errors='coerce')
+    return df
+
+def add_scan_timestamp(combined_df):
+    """
+    Create the scan_timestamp column in place when the reader could not.
+    
+    Adds the time of day to the date from created_on, or falls back to
+    created_on alone, or to the current time if neither is usable.
+    
+    Args:
+        combined_df (pandas.DataFrame): Combined data from ZMDESNR and VL06O
+        
+    Returns:
+        pandas.DataFrame: The same DataFrame
+    """
+    if 'scan_timestamp' in combined_df.columns:
+        return combined_df
+    
+    try:
+        # Check if we have time and created_on columns
+        if 'time' in combined_df.columns and 'created_on' in combined_df.columns:
+            # Convert created_on to datetime if it's not already
+            if not pd.api.types.is_datetime64_any_dtype(combined_df['created_on']):
+                combined_df['created_on'] = pd.to_datetime(combined_df['created_on'], errors='coerce')
+            
+            # Add the time of day to the date from created_on, as read_zmdesnr_file does
+            combined_df['scan_timestamp'] = combine_date_and_time(combined_df['created_on'], combined_df['time'])
+            logger.info("Created scan_timestamp from time and created_on columns")
+        else:
+            # If we don't have time and created_on, use created_on as scan_timestamp
+            if 'created_on' in combined_df.columns:
+                combined_df['scan_timestamp'] = pd.to_datetime(combined_df['created_on'], errors='coerce')
+                logger.info("Using created_on as scan_timestamp")
+            else:
+                logger.warning("Cannot create scan_timestamp, no suitable columns found")
+                # Use current time for all rows as a fallback
+                combined_df['scan_timestamp'] = datetime.now()
+                logger.warning("Using current time for all scan_timestamp values")
+    except Exception as e:
+        logger.error(f"Error creating scan_timestamp: {str(e)}")
+        # Use current time for all rows as a fallback
+        combined_df['scan_timestamp'] = datetime.now()
+        logger.warning("Using current time for all scan_timestamp values due to error")
+    
+    return combined_df
+
 def calculate_progress_metrics(combined_df):
     """
     Calculate progress metrics for each delivery.
@@ -33,19 +94,14 @@ def calculate_progress_metrics(combined_df):
     if combined_df.empty:
         return pd.DataFrame()
     
-    # Group by delivery and created_by to get counts per user per delivery
-    user_delivery_counts = combined_df.groupby(['delivery', 'created_by']).size().reset_index(name='scanned_count')
-    
-    # Get the total package count for each delivery
-    delivery_totals = combined_df[['delivery', 'number_of_packages']].drop_duplicates()
-    
-    # Merge the counts with the totals
-    progress_df = pd.merge(
-        user_delivery_counts,
-        delivery_totals,
-        on='delivery',
-        how='left'
-    )
+    # Count scans per user per delivery, carrying the delivery's package total
+    # in the group key instead of deduplicating and merging it back afterwards
+    # (rows without a delivery or user are skipped; a missing total is kept)
+    has_keys = combined_df['delivery'].notna() & combined_df['created_by'].notna()
+    progress_df = combined_df[has_keys].groupby(
+        ['delivery', 'created_by', 'number_of_packages'], dropna=False, observed=True
+    ).size().reset_index(name='scanned_count')
+    progress_df = progress_df[['delivery', 'created_by', 'scanned_count', 'number_of_packages']]
     
     # Calculate progress percentage
     progress_df['progress_percentage'] = (progress_df['scanned_count'] / progress_df['number_of_packages'] * 100).round(2)
@@ -79,11 +135,7 @@ def get_scan_time_metrics(combined_df):
                 if not pd.api.types.is_datetime64_any_dtype(combined_df['created_on']):
                     combined_df['created_on'] = pd.to_datetime(combined_df['created_on'], errors='coerce')
                 
-                # Create scan_timestamp by combining date from created_on and time
-                combined_df['scan_timestamp'] = pd.to_datetime(
-                    combined_df['created_on'].dt.strftime('%Y-%m-%d') + ' ' + combined_df['time'], 
-                    errors='coerce'
-                )
+                combined_df['scan_timestamp'] = combine_date_and_time(combined_df['created_on'], combined_df['time'])
                 logger.info("Created scan_timestamp from time and created_on columns")
             except Exception as e:
                 logger.error(f"Error creating scan_timestamp: {str(e)}")
@@ -98,27 +150,9 @@ def get_scan_time_metrics(combined_df):
             if not pd.api.types.is_datetime64_any_dtype(combined_df['created_on']):
                 combined_df['created_on'] = pd.to_datetime(combined_df['created_on'], errors='coerce')
             
-            # Check if time_str exists (created in readers.py)
-            if 'time_str' in combined_df.columns:
-                # Create scan_timestamp by combining date from created_on and time_str
-                combined_df['scan_timestamp'] = pd.to_datetime(
-                    combined_df['created_on'].dt.strftime('%Y-%m-%d') + ' ' + combined_df['time_str'], 
-                    errors='coerce'
-                )
-                logger.info("Created scan_timestamp from time_str and created_on columns")
-            elif 'time' in combined_df.columns:
-                # Convert time to string if it's not already
-                if not pd.api.types.is_object_dtype(combined_df['time']):
-                    # If time is a datetime.time object, convert to string
-                    combined_df['time_str'] = combined_df['time'].apply(lambda x: x.strftime('%H:%M:%S') if hasattr(x, 'strftime') else str(x))
-                else:
-                    combined_df['time_str'] = combined_df['time']
-                
-                # Create scan_timestamp by combining date from created_on and time_str
-                combined_df['scan_timestamp'] = pd.to_datetime(
-                    combined_df['created_on'].dt.strftime('%Y-%m-%d') + ' ' + combined_df['time_str'], 
-                    errors='coerce'
-                )
+            if 'time' in combined_df.columns:
+                # Add the time of day to the date from created_on, as read_zmdesnr_file does
+                combined_df['scan_timestamp'] = combine_date_and_time(combined_df['created_on'], combined_df['time'])
                 logger.info("Created scan_timestamp from time and created_on columns")
             else:
                 # Use created_on as fallback
@@ -131,7 +165,7 @@ def get_scan_time_metrics(combined_df):
             logger.warning("Using current time for all scan_timestamp values due to error")
     
     # Ensure scan_timestamp is datetime
-    combined_df['scan_timestamp'] = pd.to_datetime(combined_df['scan_timestamp'], errors='coerce')
+    ensure_datetime_column(combined_df, 'scan_timestamp')
     
     # Drop rows with missing scan_timestamp or created_by
     valid_df = combined_df.dropna(subset=['scan_timestamp', 'created_by'])
@@ -143,60 +177,42 @@ def get_scan_time_metrics(combined_df):
     # Sort by user and timestamp
     sorted_df = valid_df.sort_values(['created_by', 'scan_timestamp'])
     
-    # Group by user
-    user_groups = sorted_df.groupby('created_by')
+    # Latest scan per user, and the first row scanned at that time
+    scan_times = sorted_df['scan_timestamp']
+    latest_scans = scan_times.groupby(sorted_df['created_by'], observed=True).transform('max')
+    is_latest = scan_times == latest_scans
+    latest_rows = sorted_df[is_latest].drop_duplicates('created_by')
     
-    # Initialize lists to store results
-    users = []
-    current_scans = []
-    previous_scans = []
-    time_differences = []
-    serials = []
-    statuses = []
+    # Previous scan: the latest timestamp strictly before the latest scan
+    # (NaT when the user only has scans at a single time)
+    previous_scans = scan_times.where(~is_latest).groupby(sorted_df['created_by'], observed=True).max()
+    previous_scans = previous_scans.reindex(latest_rows['created_by']).to_numpy()
     
     # Current time for reference
     now = datetime.now()
     
-    for user, group in user_groups:
-        # Get the latest scan for this user
-        latest_scan = group['scan_timestamp'].max()
-        latest_row = group[group['scan_timestamp'] == latest_scan].iloc[0]
-        
-        # Get serial number and status if available
-        serial = str(latest_row.get('serial_number', '')) if 'serial_number' in latest_row else str(latest_row.get('Serial #', ''))
-        status = str(latest_row.get('status', '')) if 'status' in latest_row else ''
-        
-        # If we have at least two scans, get the previous one
-        if len(group) > 1:
-            # Get all timestamps except the latest
-            previous_timestamps = group[group['scan_timestamp'] < latest_scan]['scan_timestamp']
-            if not previous_timestamps.empty:
-                previous_scan = previous_timestamps.max()
-                previous_row = group[group['scan_timestamp'] == previous_scan].iloc[0]
-                time_diff = (latest_scan - previous_scan).total_seconds() / 60  # in minutes
-            else:
-                previous_scan = pd.NaT
-                time_diff = np.nan
-        else:
-            previous_scan = pd.NaT
-            time_diff = np.nan
-        
-        users.append(user)
-        current_scans.append(latest_scan)
-        previous_scans.append(previous_scan)
-        time_differences.append(time_diff)
-        serials.append(serial)
-        statuses.append(status)
+    # Get serial number and status if available, as str() of each value
+    if 'serial_number' in latest_rows.columns:
+        serials = latest_rows['serial_number'].to_numpy(dtype=object).astype(str)
+    elif 'Serial #' in latest_rows.columns:
+        serials = latest_rows['Serial #'].to_numpy(dtype=object).astype(str)
+    else:
+        serials = ''
+    statuses = latest_rows['status'].to_numpy(dtype=object).astype(str) if 'status' in latest_rows.columns else ''
     
     # Create DataFrame with results
     scan_metrics_df = pd.DataFrame({
-        'user_id': users,
-        'current_scan_time': current_scans,
+        'user_id': latest_rows['created_by'].to_numpy(dtype=object),
+        'current_scan_time': latest_rows['scan_timestamp'].to_numpy(),
         'previous_scan_time': previous_scans,
-        'time_between_scans_minutes': time_differences,
         'serial': serials,
         'status': statuses
     })
+    scan_metrics_df.insert(
+        3,
+        'time_between_scans_minutes',
+        (scan_metrics_df['current_scan_time'] - scan_metrics_df['previous_scan_time']).dt.total_seconds() / 60
+    )
     
     # Calculate time since last scan
     scan_metrics_df['minutes_since_last_scan'] = (
@@ -226,52 +242,10 @@ def get_user_activity_metrics(combined_df, window_minutes=WINDOW_MINUTES):
         return pd.DataFrame()
     
     # Use scan_timestamp if it exists, otherwise try to create it
-    if 'scan_timestamp' not in combined_df.columns:
-        try:
-            # Check if we have time_str and created_on columns
-            if 'time_str' in combined_df.columns and 'created_on' in combined_df.columns:
-                # Convert created_on to datetime if it's not already
-                if not pd.api.types.is_datetime64_any_dtype(combined_df['created_on']):
-                    combined_df['created_on'] = pd.to_datetime(combined_df['created_on'], errors='coerce')
-                
-                # Create scan_timestamp by combining date from created_on and time_str
-                combined_df['scan_timestamp'] = pd.to_datetime(
-                    combined_df['created_on'].dt.strftime('%Y-%m-%d') + ' ' + combined_df['time_str'], 
-                    errors='coerce'
-                )
-                logger.info("Created scan_timestamp from time_str and created_on columns")
-            elif 'time' in combined_df.columns and 'created_on' in combined_df.columns:
-                # Convert time to string if it's not already
-                if not pd.api.types.is_object_dtype(combined_df['time']):
-                    # If time is a datetime.time object, convert to string
-                    combined_df['time_str'] = combined_df['time'].apply(lambda x: x.strftime('%H:%M:%S') if hasattr(x, 'strftime') else str(x))
-                else:
-                    combined_df['time_str'] = combined_df['time']
-                
-                # Create scan_timestamp by combining date from created_on and time_str
-                combined_df['scan_timestamp'] = pd.to_datetime(
-                    combined_df['created_on'].dt.strftime('%Y-%m-%d') + ' ' + combined_df['time_str'], 
-                    errors='coerce'
-                )
-                logger.info("Created scan_timestamp from time and created_on columns")
-            else:
-                # If we don't have time and created_on, use created_on as scan_timestamp
-                if 'created_on' in combined_df.columns:
-                    combined_df['scan_timestamp'] = pd.to_datetime(combined_df['created_on'], errors='coerce')
-                    logger.info("Using created_on as scan_timestamp")
-                else:
-                    logger.warning("Cannot create scan_timestamp, no suitable columns found")
-                    # Use current time for all rows as a fallback
-                    combined_df['scan_timestamp'] = datetime.now()
-                    logger.warning("Using current time for all scan_timestamp values")
-        except Exception as e:
-            logger.error(f"Error creating scan_timestamp: {str(e)}")
-            # Use current time for all rows as a fallback
-            combined_df['scan_timestamp'] = datetime.now()
-            logger.warning("Using current time for all scan_timestamp values due to error")
+    add_scan_timestamp(combined_df)
     
     # Ensure scan_timestamp is datetime
-    combined_df['scan_timestamp'] = pd.to_datetime(combined_df['scan_timestamp'], errors='coerce')
+    ensure_datetime_column(combined_df, 'scan_timestamp')
     
     # Drop rows with missing scan_timestamp or created_by
     valid_df = combined_df.dropna(subset=['scan_timestamp', 'created_by'])
@@ -284,8 +258,11 @@ def get_user_activity_metrics(combined_df, window_minutes=WINDOW_MINUTES):
     now = datetime.now()
     cutoff_time = now - timedelta(minutes=window_minutes)
     
-    # Filter for scans within the window
-    recent_scans = valid_df[valid_df['scan_timestamp'] >= cutoff_time]
+    # Filter for scans within the window, comparing the raw int64 ticks
+    # (NaT rows were dropped above, so no NaT handling is needed)
+    scan_ticks = valid_df['scan_timestamp'].to_numpy()
+    cutoff_tick = np.datetime64(cutoff_time).astype(scan_ticks.dtype)
+    recent_scans = valid_df[scan_ticks.view('i8') >= cutoff_tick.view('i8')]
     
     if recent_scans.empty:
         logger.warning("No recent scans within the time window")
@@ -303,7 +280,7 @@ def get_user_activity_metrics(combined_df, window_minutes=WINDOW_MINUTES):
         return user_df
     
     # Group by user and calculate metrics
-    user_metrics = recent_scans.groupby('created_by').agg({
+    user_metrics = recent_scans.groupby('created_by', observed=True).agg({
         'scan_timestamp': ['count', 'min', 'max'],
         'delivery': 'nunique'
     })
@@ -328,17 +305,12 @@ def get_user_activity_metrics(combined_df, window_minutes=WINDOW_MINUTES):
     
     # Add name column if available
     if 'name' in combined_df.columns:
-        # Create a mapping of user IDs to names
-        name_map = {}
-        for user_id in user_metrics['created_by']:
-            user_rows = combined_df[combined_df['created_by'] == user_id]
-            if not user_rows.empty and not pd.isna(user_rows['name'].iloc[0]):
-                name_map[user_id] = user_rows['name'].iloc[0]
-            else:
-                name_map[user_id] = f"User {user_id}"
+        # Map each user ID to the name on its first row (one pass instead of a scan per user)
+        first_names = combined_df.drop_duplicates('created_by').set_index('created_by')['name']
+        names = user_metrics['created_by'].map(first_names)
         
-        # Add the name column
-        user_metrics['name'] = user_metrics['created_by'].map(name_map)
+        # Add the name column, falling back to a generic label
+        user_metrics['name'] = names.where(names.notna(), 'User ' + user_metrics['created_by'].astype(str))
     
     return user_metrics
 
@@ -355,19 +327,25 @@ def track_serial_status_changes(combined_df):
     if combined_df.empty or 'status' not in combined_df.columns or 'serial_number' not in combined_df.columns:
         return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
     
-    # Get previous dashboard data from cache
-    previous_data = dashboard_cache.get('previous_dashboard_data', {})
+    # Get previous dashboard data (cache, or the latest Parquet snapshot);
+    # only the serial numbers and their statuses are compared
+    previous_data = get_previous_dashboard_data(sections=['serials'], columns=['serial_number', 'status'])
     previous_serials = previous_data.get('serials', [])
     
-    # Log the status distribution in the current data
-    if not combined_df.empty and 'status' in combined_df.columns:
+    # Log the status distribution in the current data (counting every row is
+    # only worth it when DEBUG output is actually emitted)
+    if logger.isEnabledFor(logging.DEBUG):
         status_counts = combined_df['status'].value_counts()
-        logger.info(f"Current status distribution: {status_counts.to_dict()}")
+        logger.debug(f"Current status distribution: {status_counts.to_dict()}")
+    
+    # Status masks are reused by every step below
+    is_ash = combined_df['status'].eq('ASH')
+    is_shp = combined_df['status'].eq('SHP')
     
     # If no previous data, all serials are new
     if not previous_serials:
         # Mark all ASH status serials as newly picked
-        new_serials_df = combined_df[combined_df['status'] == 'ASH'].copy()
+        new_serials_df = combined_df[is_ash]
         if not new_serials_df.empty:
             new_serials_df['event'] = 'newly_picked'
             logger.info(f"Found {len(new_serials_df)} new serials (first run)")
@@ -387,11 +365,11 @@ def track_serial_status_changes(combined_df):
     
     # Find new serials (in current but not in previous)
     if 'serial_number' in previous_df.columns:
-        new_serials = set(combined_df['serial_number']) - set(previous_df['serial_number'])
-        new_serials_df = combined_df[combined_df['serial_number'].isin(new_serials)].copy()
+        # Flag current serials that already existed in the previous data (reused below)
+        in_previous = combined_df['serial_number'].isin(previous_df['serial_number'])
         
         # Filter for only ASH status (newly picked)
-        new_serials_df = new_serials_df[new_serials_df['status'] == 'ASH'].copy()
+        new_serials_df = combined_df[~in_previous & is_ash]
         if not new_serials_df.empty:
             new_serials_df['event'] = 'newly_picked'
             logger.info(f"Found {len(new_serials_df)} newly picked serials")
@@ -404,18 +382,12 @@ def track_serial_status_changes(combined_df):
         # Create a mapping of previous serial numbers to their status
         prev_status_map = dict(zip(previous_df['serial_number'], previous_df['status']))
         
-        # Filter for serials that exist in both datasets
-        common_serials = set(combined_df['serial_number']) & set(previous_df['serial_number'])
-        common_serials_df = combined_df[combined_df['serial_number'].isin(common_serials)].copy()
-        
-        # Add previous status column
-        common_serials_df['previous_status'] = common_serials_df['serial_number'].map(prev_status_map)
+        # Only serials that existed before and are SHP now can have changed from ASH to SHP
+        shipped_serials_df = combined_df[in_previous & is_shp]
         
-        # Filter for status changes from ASH to SHP
-        status_changes_df = common_serials_df[
-            (common_serials_df['previous_status'] == 'ASH') & 
-            (common_serials_df['status'] == 'SHP')
-        ].copy()
+        # Look up the previous status and keep the ones that were ASH
+        previous_status = shipped_serials_df['serial_number'].map(prev_status_map)
+        status_changes_df = shipped_serials_df[previous_status.eq('ASH')].assign(previous_status='ASH')
         
         if not status_changes_df.empty:
             status_changes_df['event'] = 'shipped'
@@ -424,19 +396,24 @@ def track_serial_status_changes(combined_df):
     # Find completed deliveries (all serials for a delivery are SHP)
     completed_deliveries_df = pd.DataFrame()
     if not combined_df.empty:
-        # Group by delivery and count total serials and shipped serials
-        delivery_status = combined_df.groupby('delivery').agg({
-            'serial_number': 'count',
-            'status': lambda x: (x == 'SHP').sum()
-        }).reset_index()
+        # Count total serials and shipped serials per delivery in one linear
+        # pass over the factorized delivery codes instead of a hash groupby
+        delivery_codes, deliveries = pd.factorize(combined_df['delivery'], sort=True)
+        valid = delivery_codes >= 0
+        delivery_codes = delivery_codes[valid]
+        has_serial = combined_df['serial_number'].notna().to_numpy()[valid]
+        shipped = is_shp.to_numpy()[valid]
         
-        # Rename columns for clarity
-        delivery_status.columns = ['delivery', 'total_serials', 'shipped_serials']
+        delivery_status = pd.DataFrame({
+            'delivery': deliveries,
+            'total_serials': np.bincount(delivery_codes, weights=has_serial, minlength=len(deliveries)).astype(np.int64),
+            'shipped_serials': np.bincount(delivery_codes, weights=shipped, minlength=len(deliveries)).astype(np.int64)
+        })
         
         # Filter for deliveries where all serials are shipped
         completed_deliveries_df = delivery_status[
             delivery_status['total_serials'] == delivery_status['shipped_serials']
-        ].copy()
+        ]
         
         if not completed_deliveries_df.empty:
             completed_deliveries_df['event'] = 'completed'
@@ -444,6 +421,28 @@ def track_serial_status_changes(combined_df):
     
     return status_changes_df, new_serials_df, completed_deliveries_df
 
+def dataframe_to_records(df):
+    """
+    Convert a DataFrame to a list of records with missing values as None.
+    
+    NaN/NaT are replaced in one vectorized where() over the whole frame rather
+    than cleaning each value afterwards, so the records are JSON-ready. The
+    records are zipped from one list per column, which avoids the per-row
+    overhead of to_dict(orient='records').
+    
+    Args:
+        df (pandas.DataFrame): DataFrame to convert
+        
+    Returns:
+        list: List of record dicts, or empty list if the DataFrame is empty
+    """
+    if df.empty:
+        return []
+    df = df.astype(object).where(df.notna(), None)
+    columns = list(df.columns)
+    values = [df.iloc[:, i].tolist() for i in range(len(columns))]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
 def preprocess_serial_data(combined_df):
     """
     Preprocess serial data to handle cumulative snapshots.
@@ -460,24 +459,18 @@ def preprocess_serial_data(combined_df):
     if combined_df.empty or 'serial_number' not in combined_df.columns or 'status' not in combined_df.columns:
         return combined_df
     
-    # Make a copy to avoid modifying the original
-    df = combined_df.copy()
-    
     # Get count of rows before preprocessing
-    initial_count = len(df)
-    
-    # Create a flag for SHP status
-    df['is_shp'] = df['status'] == 'SHP'
+    initial_count = len(combined_df)
     
-    # Sort by serial_number and is_shp (True values first)
-    # This ensures SHP records come before ASH records for the same serial
-    df = df.sort_values(['serial_number', 'is_shp'], ascending=[True, False])
+    # Flag SHP rows and the serials that have at least one of them
+    is_shp = combined_df['status'] == 'SHP'
+    has_shp = combined_df['serial_number'].isin(combined_df.loc[is_shp, 'serial_number'])
     
-    # Keep only the first occurrence of each serial_number (which will be SHP if it exists)
-    df = df.drop_duplicates('serial_number', keep='first')
-    
-    # Remove the temporary flag
-    df = df.drop('is_shp', axis=1)
+    # Drop the other rows of serials that have an SHP row, then keep the first
+    # occurrence of each serial_number (which will be SHP if it exists).
+    # This is a linear pass; only the deduplicated frame gets sorted.
+    df = combined_df[is_shp | ~has_shp].drop_duplicates('serial_number', keep='first')
+    df = df.sort_values('serial_number', kind='stable')
     
     # Get count of rows after preprocessing
     final_count = len(df)
@@ -510,9 +503,6 @@ def prepare_dashboard_data(combined_df):
             'completed_deliveries': []
         }
     
-    # Make a copy to avoid modifying the original
-    df = combined_df.copy()
-    
     # Standardize column names from Excel files
     # Map common Excel column names to our expected column names
     column_mapping = {
@@ -524,26 +514,40 @@ def prepare_dashboard_data(combined_df):
         'Number of packages': 'number_of_packages'
     }
     
-    # Apply the mapping for columns that exist
-    for excel_col, std_col in column_mapping.items():
-        if excel_col in df.columns and std_col not in df.columns:
-            df[std_col] = df[excel_col]
+    # Add the mapped columns that are missing in a single assign, which also
+    # makes the copy that keeps the original unmodified
+    df = combined_df.assign(**{
+        std_col: combined_df[excel_col]
+        for excel_col, std_col in column_mapping.items()
+        if excel_col in combined_df.columns and std_col not in combined_df.columns
+    })
     
     # Preprocess serial data to handle cumulative snapshots
     df = preprocess_serial_data(df)
     
+    # Use categorical keys so the groupbys below hash small integer codes
+    # instead of Python strings (and share one dictionary per column)
+    df = df.astype({col: 'category' for col in ('delivery', 'created_by', 'status') if col in df.columns})
+    
+    # Build (if needed) and parse scan_timestamp once here instead of in every
+    # metric function, so the serials section below keeps it as well
+    add_scan_timestamp(df)
+    ensure_datetime_column(df, 'scan_timestamp')
+    
     # Map status codes to their descriptions
     if 'status' in df.columns:
         df['status_description'] = df['status'].map(STATUS_MAPPING)
     
-    # Calculate progress metrics
-    progress_df = calculate_progress_metrics(df)
-    
-    # Get scan time metrics
-    scan_metrics_df = get_scan_time_metrics(df)
-    
-    # Get user activity metrics
-    user_metrics_df = get_user_activity_metrics(df)
+    # Calculate progress, scan time and user activity metrics concurrently; the
+    # heavy groupby/sort kernels release the GIL. Each function gets its own
+    # shallow copy, so a column one of them adds is never seen by the others
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        progress_future = executor.submit(calculate_progress_metrics, df.copy(deep=False))
+        scan_metrics_future = executor.submit(get_scan_time_metrics, df.copy(deep=False))
+        user_metrics_future = executor.submit(get_user_activity_metrics, df.copy(deep=False))
+        progress_df = progress_future.result()
+        scan_metrics_df = scan_metrics_future.result()
+        user_metrics_df = user_metrics_future.result()
     
     # Track serial status changes
     status_changes_df, new_serials_df, completed_deliveries_df = track_serial_status_changes(df)
@@ -557,7 +561,7 @@ def prepare_dashboard_data(combined_df):
                         [col for col in optional_columns if col in df.columns]
     
     if columns_to_select:
-        serials_df = df[columns_to_select].copy()
+        serials_df = df[columns_to_select]
         
         # Add status description if available
         if 'status_description' in df.columns:
@@ -569,16 +573,24 @@ def prepare_dashboard_data(combined_df):
     if not user_metrics_df.empty and 'created_by' in user_metrics_df.columns:
         user_metrics_df = user_metrics_df.rename(columns={'created_by': 'user_id'})
     
+    # One row per delivery with its package total; the readers join each
+    # delivery to a single VL06O row, so deduplicating on the categorical
+    # delivery codes alone is enough (no hashing of row tuples)
+    if 'delivery' in df.columns and 'number_of_packages' in df.columns:
+        deliveries_df = df[['delivery', 'number_of_packages']].drop_duplicates('delivery')
+    else:
+        deliveries_df = pd.DataFrame()
+    
     # Combine user metrics with progress and scan times
     dashboard_data = {
-        'users': user_metrics_df.to_dict(orient='records') if not user_metrics_df.empty else [],
-        'deliveries': df[['delivery', 'number_of_packages']].drop_duplicates().to_dict(orient='records') if 'delivery' in df.columns and 'number_of_packages' in df.columns else [],
-        'progress': progress_df.to_dict(orient='records') if not progress_df.empty else [],
-        'scan_times': scan_metrics_df.to_dict(orient='records') if not scan_metrics_df.empty else [],
-        'serials': serials_df.to_dict(orient='records') if not serials_df.empty else [],
-        'status_changes': status_changes_df.to_dict(orient='records') if not status_changes_df.empty else [],
-        'new_serials': new_serials_df.to_dict(orient='records') if not new_serials_df.empty else [],
-        'completed_deliveries': completed_deliveries_df.to_dict(orient='records') if not completed_deliveries_df.empty else []
+        'users': dataframe_to_records(user_metrics_df),
+        'deliveries': dataframe_to_records(deliveries_df),
+        'progress': dataframe_to_records(progress_df),
+        'scan_times': dataframe_to_records(scan_metrics_df),
+        'serials': dataframe_to_records(serials_df),
+        'status_changes': dataframe_to_records(status_changes_df),
+        'new_serials': dataframe_to_records(new_serials_df),
+        'completed_deliveries': dataframe_to_records(completed_deliveries_df)
     }
     
     # Log the counts for each section
@@ -3,7 +3,6 @@ File watching mechanism for new files in the ZMDESNR and VL06O directories.
 """
 import os
 import time
-import glob
 from datetime import datetime
 import sys
 import logging
@@ -13,6 +12,7 @@ from watchdog.events import FileSystemEventHandler
 # Add the project root to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 from config import SERIAL_NUMBERS_DIR, DELIVERY_INFO_DIR, INTERVAL_SECONDS
+from backend.data_processing.readers import get_latest_file
 
 # Set up logging
 logging.basicConfig(
@@ -30,7 +30,7 @@ class ExcelFileHandler(FileSystemEventHandler):
         Initialize the handler with an optional callback function.
         
         Args:
-            callback (callable, optional): Function to call when a new file is detected
+            callback (callable, optional): Function to call with {file_type: file_path} when a new file is detected
         """
         self.callback = callback
         self.last_processed_files = {
@@ -65,7 +65,7 @@ class ExcelFileHandler(FileSystemEventHandler):
             
             # Call the callback if provided
             if self.callback:
-                self.callback(file_type, file_path)
+                self.callback({file_type: file_path})
 
 def get_latest_files():
     """
@@ -74,17 +74,9 @@ def get_latest_files():
     Returns:
         dict: Dictionary with the latest file paths
     """
-    # Get the latest ZMDESNR file
-    zmdesnr_files = glob.glob(os.path.join(SERIAL_NUMBERS_DIR, "*ZMDESNR*.xlsx"))
-    latest_zmdesnr = max(zmdesnr_files, key=os.path.getmtime) if zmdesnr_files else None
-    
-    # Get the latest VL06O file
-    vl06o_files = glob.glob(os.path.join(DELIVERY_INFO_DIR, "*VL06O*.xlsx"))
-    latest_vl06o = max(vl06o_files, key=os.path.getmtime) if vl06o_files else None
-    
     return {
-        'zmdesnr': latest_zmdesnr,
-        'vl06o': latest_vl06o
+        'zmdesnr': get_latest_file(SERIAL_NUMBERS_DIR, "*ZMDESNR*.xlsx"),
+        'vl06o': get_latest_file(DELIVERY_INFO_DIR, "*VL06O*.xlsx")
     }
 
 def start_file_watcher(callback=None):
@@ -113,18 +105,25 @@ def start_file_watcher(callback=None):
     
     return observer, handler
 
-def poll_for_new_files(callback=None, interval=INTERVAL_SECONDS):
+def poll_for_new_files(callback=None, interval=INTERVAL_SECONDS, last_processed=None):
     """
     Poll for new files at regular intervals.
     This is an alternative to using watchdog for systems where it might not work well.
     
+    New files found in the same poll are reported together in one callback,
+    so a refresh where both reports were replaced is processed only once.
+    
     Args:
-        callback (callable, optional): Function to call when a new file is detected
+        callback (callable, optional): Function to call with {file_type: file_path}
+            for the new files
         interval (int): Polling interval in seconds
+        last_processed (dict, optional): Latest files that were already processed
+            (as returned by get_latest_files), so they aren't reported again
     """
     last_processed = {
         'zmdesnr': None,
-        'vl06o': None
+        'vl06o': None,
+        **(last_processed or {})
     }
     
     logger.info(f"Started polling for new files every {interval} seconds")
@@ -134,19 +133,19 @@ def poll_for_new_files(callback=None, interval=INTERVAL_SECONDS):
             # Get the latest files
             latest_files = get_latest_files()
             
-            # Check for new ZMDESNR file
-            if latest_files['zmdesnr'] and latest_files['zmdesnr'] != last_processed['zmdesnr']:
-                logger.info(f"New ZMDESNR file detected: {latest_files['zmdesnr']}")
-                last_processed['zmdesnr'] = latest_files['zmdesnr']
-                if callback:
-                    callback('zmdesnr', latest_files['zmdesnr'])
+            # Collect every new file found in this poll
+            new_files = {
+                file_type: file_path
+                for file_type, file_path in latest_files.items()
+                if file_path and file_path != last_processed[file_type]
+            }
             
-            # Check for new VL06O file
-            if latest_files['vl06o'] and latest_files['vl06o'] != last_processed['vl06o']:
-                logger.info(f"New VL06O file detected: {latest_files['vl06o']}")
-                last_processed['vl06o'] = latest_files['vl06o']
+            if new_files:
+                for file_type, file_path in new_files.items():
+                    logger.info(f"New {file_type.upper()} file detected: {file_path}")
+                last_processed.update(new_files)
                 if callback:
-                    callback('vl06o', latest_files['vl06o'])
+                    callback(new_files)
             
             # Sleep for the specified interval
             time.sleep(interval)
@@ -154,15 +153,15 @@ def poll_for_new_files(callback=None, interval=INTERVAL_SECONDS):
     except KeyboardInterrupt:
         logger.info("Stopped polling for new files")
 
-def file_change_callback(file_type, file_path):
+def file_change_callback(new_files):
     """
     Example callback function for file changes.
     
     Args:
-        file_type (str): Type of file ('zmdesnr' or 'vl06o')
-        file_path (str): Path to the new file
+        new_files (dict): New file paths by file type ('zmdesnr' and/or 'vl06o')
     """
-    logger.info(f"Processing new {file_type.upper()} file: {file_path}")
+    for file_type, file_path in new_files.items():
+        logger.info(f"Processing new {file_type.upper()} file: {file_path}")
     # Here you would typically:
     # 1. Read the new file
     # 2. Process the data
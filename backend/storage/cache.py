@@ -2,7 +2,7 @@
 Data caching system for quick dashboard updates.
 """
 import os
-import json
+import orjson
 import time
 import logging
 import threading
@@ -29,6 +29,10 @@ class DashboardCache:
     _instance = None
     _lock = threading.Lock()
     
+    # Keys older versions wrote that are no longer used; dropped when the cache
+    # file is loaded so they aren't serialized again on every save
+    _OBSOLETE_KEYS = ('previous_dashboard_data',)
+    
     def __new__(cls):
         """
         Singleton pattern to ensure only one cache instance exists.
@@ -48,6 +52,8 @@ class DashboardCache:
         
         self._cache = {}
         self._last_updated = {}
+        # Keys whose values were read back from the JSON file rather than set in this process
+        self._loaded_keys = set()
         self._cache_file = os.path.join(OUT_DIR, "dashboard_cache.json")
         self._initialized = True
         self._lock = threading.RLock()
@@ -60,12 +66,18 @@ class DashboardCache:
         Load cache from disk.
         """
         try:
-            if os.path.exists(self._cache_file):
-                with open(self._cache_file, 'r') as f:
-                    cache_data = json.load(f)
-                    self._cache = cache_data.get('data', {})
-                    self._last_updated = cache_data.get('last_updated', {})
-                    logger.info(f"Loaded cache from {self._cache_file}")
+            with open(self._cache_file, 'rb') as f:
+                cache_data = orjson.loads(f.read())
+                self._cache = cache_data.get('data', {})
+                self._last_updated = cache_data.get('last_updated', {})
+                for key in self._OBSOLETE_KEYS:
+                    self._cache.pop(key, None)
+                    self._last_updated.pop(key, None)
+                self._loaded_keys = set(self._cache)
+                logger.info(f"Loaded cache from {self._cache_file}")
+        except FileNotFoundError:
+            # No cache saved yet
+            pass
         except Exception as e:
             logger.error(f"Error loading cache: {str(e)}")
     
@@ -94,12 +106,12 @@ class DashboardCache:
         elif isinstance(data, np.ndarray):
             # Handle numpy arrays by converting to a list and sanitizing each item
             return [self._sanitize_for_json(item) for item in data.tolist()]
-        elif pd.isna(data) or (hasattr(data, 'is_nan') and data.is_nan()):
-            return None
         elif isinstance(data, dict):
             return {k: self._sanitize_for_json(v) for k, v in data.items()}
         elif isinstance(data, (list, tuple)):
             return [self._sanitize_for_json(item) for item in data]
+        elif pd.isna(data) or (hasattr(data, 'is_nan') and data.is_nan()):
+            return None
         else:
             # Convert anything else to string
             try:
@@ -116,9 +128,9 @@ class DashboardCache:
             cache_copy = {}
             for key, value in self._cache.items():
                 # Handle numpy arrays or pandas Series/DataFrames
-                if hasattr(value, 'any') or value.any():
+                if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
                     # Convert to list or dict before sanitizing
-                    if hasattr(value, 'to_dict'):
+                    if isinstance(value, pd.DataFrame):
                         # For pandas DataFrames
                         cache_copy[key] = value.to_dict('records')
                     else:
@@ -135,9 +147,14 @@ class DashboardCache:
                 'last_updated': self._last_updated
             }
             
-            with open(self._cache_file, 'w') as f:
-                json.dump(cache_data, f, indent=2)
-                logger.info(f"Saved cache to {self._cache_file}")
+            # Write to a temporary file and swap it in, so a crash mid-write
+            # never leaves a truncated cache file behind
+            tmp_file = self._cache_file + '.tmp'
+            with open(tmp_file, 'wb', buffering=1 << 20) as f:
+                # Compact output: the file is only read back by _load_cache
+                f.write(orjson.dumps(cache_data, option=orjson.OPT_NON_STR_KEYS))
+            os.replace(tmp_file, self._cache_file)
+            logger.info(f"Saved cache to {self._cache_file}")
         except Exception as e:
             logger.error(f"Error saving cache: {str(e)}")
     
@@ -166,6 +183,7 @@ class DashboardCache:
         with self._lock:
             self._cache[key] = value
             self._last_updated[key] = datetime.now().isoformat()
+            self._loaded_keys.discard(key)
             self._save_cache()
     
     def update(self, data):
@@ -176,9 +194,11 @@ class DashboardCache:
             data (dict): Dictionary of key-value pairs to update
         """
         with self._lock:
+            now = datetime.now().isoformat()
             for key, value in data.items():
                 self._cache[key] = value
-                self._last_updated[key] = datetime.now().isoformat()
+                self._last_updated[key] = now
+                self._loaded_keys.discard(key)
             self._save_cache()
     
     def delete(self, key):
@@ -193,6 +213,7 @@ class DashboardCache:
                 del self._cache[key]
                 if key in self._last_updated:
                     del self._last_updated[key]
+                self._loaded_keys.discard(key)
                 self._save_cache()
     
     def clear(self):
@@ -202,6 +223,7 @@ class DashboardCache:
         with self._lock:
             self._cache = {}
             self._last_updated = {}
+            self._loaded_keys = set()
             self._save_cache()
     
     def get_last_updated(self, key):
@@ -217,6 +239,22 @@ class DashboardCache:
         with self._lock:
             return self._last_updated.get(key)
     
+    def is_loaded_from_disk(self, key):
+        """
+        Check if a cached value was read back from the cache file.
+        
+        Such values went through JSON, so timestamps are ISO strings and
+        numpy types are plain Python values.
+        
+        Args:
+            key (str): Cache key
+            
+        Returns:
+            bool: True if the value was loaded from disk and not set since, False otherwise
+        """
+        with self._lock:
+            return key in self._loaded_keys
+    
     def is_stale(self, key, max_age_seconds):
         """
         Check if a cached value is stale.
@@ -2,15 +2,22 @@
 Parquet file management for storing processed data.
 """
 import os
+import re
+import tempfile
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 import json
 from datetime import datetime
+from functools import lru_cache
 import logging
 import sys
 
 # Add the project root to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 from config import OUT_DIR
+from backend.storage.cache import dashboard_cache
 
 # Set up logging
 logging.basicConfig(
@@ -19,6 +26,38 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Parquet files are named {section}_{YYYYmmddHHMMSS}.parquet
+_SNAPSHOT_FILE_RE = re.compile(r'^(.+)_(\d{14})\.parquet$')
+
+def write_parquet(df, file_path):
+    """
+    Write a DataFrame to a Parquet file.
+    
+    Goes straight through pyarrow with zstd level 1 and dictionary encoding,
+    which is cheaper than the to_parquet defaults for the small, repetitive
+    dashboard sections (status, user and delivery columns). The file is
+    written under a unique temporary name in the same directory and swapped
+    in, so readers never see a partially written file and two writers of the
+    same path never share a temporary file.
+    
+    Args:
+        df (pandas.DataFrame): Data to write
+        file_path (str): Destination path
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or '.',
+                                    prefix=os.path.basename(file_path) + '.', suffix='.tmp')
+    os.close(fd)
+    try:
+        pq.write_table(table, tmp_path, compression='zstd', compression_level=1, use_dictionary=True)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
 def save_to_parquet(data, data_type, timestamp=None):
     """
     Save data to a Parquet file.
@@ -48,11 +87,12 @@ def save_to_parquet(data, data_type, timestamp=None):
                     try:
                         df = pd.DataFrame(section_data)
                         file_path = os.path.join(OUT_DIR, f"{section}_{timestamp}.parquet")
-                        df.to_parquet(file_path, index=False)
-                        logger.info(f"Saved {section} data to {file_path}")
+                        write_parquet(df, file_path)
+                        logger.debug("Saved %s data to %s", section, file_path)
                         file_paths[section] = file_path
                     except Exception as e:
                         logger.error(f"Error saving {section} data to Parquet: {str(e)}")
+            logger.info(f"Saved {len(file_paths)} dashboard sections to {OUT_DIR}")
             return file_paths
         else:
             # Convert single section to DataFrame
@@ -67,26 +107,27 @@ def save_to_parquet(data, data_type, timestamp=None):
     # Save the DataFrame to a Parquet file
     file_path = os.path.join(OUT_DIR, f"{data_type}_{timestamp}.parquet")
     try:
-        df.to_parquet(file_path, index=False)
+        write_parquet(df, file_path)
         logger.info(f"Saved {data_type} data to {file_path}")
         return file_path
     except Exception as e:
         logger.error(f"Error saving {data_type} data to Parquet: {str(e)}")
         return None
 
-def load_from_parquet(file_path):
+def load_from_parquet(file_path, columns=None):
     """
     Load data from a Parquet file.
     
     Args:
         file_path (str): Path to the Parquet file
+        columns (list, optional): Only read these columns
         
     Returns:
         pandas.DataFrame: Loaded data
     """
     try:
-        df = pd.read_parquet(file_path)
-        logger.info(f"Loaded data from {file_path}")
+        df = pd.read_parquet(file_path, engine='pyarrow', columns=columns)
+        logger.debug("Loaded data from %s", file_path)
         return df
     except Exception as e:
         logger.error(f"Error loading data from {file_path}: {str(e)}")
@@ -102,15 +143,19 @@ def get_latest_parquet(data_type):
     Returns:
         str: Path to the most recent Parquet file, or None if no files found
     """
-    pattern = f"{data_type}_*.parquet"
-    files = [os.path.join(OUT_DIR, f) for f in os.listdir(OUT_DIR) if f.startswith(data_type) and f.endswith('.parquet')]
-    
-    if not files:
-        return None
+    # Scan the directory once and pick the most recently modified file while
+    # scanning; DirEntry caches its stat result (free on Windows)
+    with os.scandir(OUT_DIR) as entries:
+        latest = max(
+            (
+                entry for entry in entries
+                if entry.name.startswith(data_type) and entry.name.endswith('.parquet') and entry.is_file()
+            ),
+            key=lambda entry: entry.stat().st_mtime,
+            default=None
+        )
     
-    # Sort files by modification time (most recent first)
-    files.sort(key=os.path.getmtime, reverse=True)
-    return files[0]
+    return latest.path if latest is not None else None
 
 def save_dashboard_data_to_parquet(dashboard_data, timestamp=None):
     """
@@ -125,6 +170,106 @@ def save_dashboard_data_to_parquet(dashboard_data, timestamp=None):
     """
     return save_to_parquet(dashboard_data, 'dashboard', timestamp)
 
+@lru_cache(maxsize=4096)
+def parse_snapshot_filename(filename):
+    """
+    Split a Parquet snapshot filename into its section and timestamp.
+    
+    Results are cached because the same filenames are parsed on every refresh.
+    
+    Args:
+        filename (str): File name (without directory)
+        
+    Returns:
+        tuple: (section, timestamp) or None if the name doesn't match
+    """
+    match = _SNAPSHOT_FILE_RE.match(filename)
+    if match is None:
+        return None
+    return match.group(1), match.group(2)
+
+def load_dashboard_data_from_parquet(timestamp=None, sections=None, columns=None):
+    """
+    Load dashboard data from the Parquet files of a single refresh.
+    
+    Args:
+        timestamp (str, optional): Timestamp of the refresh to load. If None, the most recent one is used.
+        sections (list, optional): Only load these sections. If None, all sections are loaded.
+        columns (list, optional): Only read these columns of each section. If None, all columns are read.
+        
+    Returns:
+        dict: Dashboard data with sections, or empty dict if no files found
+    """
+    try:
+        snapshots = [parse_snapshot_filename(f) for f in os.listdir(OUT_DIR)]
+    except OSError as e:
+        logger.error(f"Error listing Parquet files in {OUT_DIR}: {str(e)}")
+        return {}
+    
+    snapshots = [parts for parts in snapshots if parts is not None]
+    if not snapshots:
+        return {}
+    
+    if timestamp is None:
+        timestamp = max(ts for _, ts in snapshots)
+    
+    dashboard_data = {}
+    for section, ts in snapshots:
+        if ts == timestamp and (sections is None or section in sections):
+            df = load_from_parquet(os.path.join(OUT_DIR, f"{section}_{ts}.parquet"), columns=columns)
+            dashboard_data[section] = df.to_dict('records')
+    
+    return dashboard_data
+
+def get_previous_dashboard_data(sections=None, columns=None):
+    """
+    Get the most recently published dashboard data to compare against.
+    
+    Uses the in-memory cache when it was set by this process. After a restart
+    the cache only holds what was read back from JSON, so the typed Parquet
+    snapshot is preferred and the cached data is used only if no snapshot exists.
+    
+    Args:
+        sections (list, optional): Sections needed from the Parquet fallback. If None, all sections are loaded.
+        columns (list, optional): Columns needed from the Parquet fallback. If None, all columns are read.
+        
+    Returns:
+        dict: Previous dashboard data or empty dict if none available
+    """
+    previous_data = dashboard_cache.get_dashboard_data()
+    if previous_data and not dashboard_cache.is_loaded_from_disk('dashboard_data'):
+        return previous_data
+    return load_dashboard_data_from_parquet(sections=sections, columns=columns) or previous_data
+
+def align_column_types(previous_df, current_df):
+    """
+    Coerce the columns of previous_df to the types of the same columns in current_df.
+    
+    Previous data read back from the JSON cache has ISO strings instead of
+    timestamps, so without this the key merges fail and every value differs.
+    
+    Args:
+        previous_df (pandas.DataFrame): Previous section data
+        current_df (pandas.DataFrame): Current section data
+        
+    Returns:
+        pandas.DataFrame: previous_df with converted columns
+    """
+    conversions = {}
+    for col in previous_df.columns.intersection(current_df.columns):
+        current_col = current_df[col]
+        previous_col = previous_df[col]
+        if current_col.dtype == previous_col.dtype:
+            continue
+        if pd.api.types.is_datetime64_any_dtype(current_col):
+            conversions[col] = pd.to_datetime(previous_col, errors='coerce', format='ISO8601')
+        elif pd.api.types.is_numeric_dtype(current_col) and not pd.api.types.is_bool_dtype(current_col):
+            conversions[col] = pd.to_numeric(previous_col, errors='coerce')
+        elif pd.api.types.is_string_dtype(current_col) or pd.api.types.is_object_dtype(current_col):
+            # Compare as text, keeping missing values missing
+            conversions[col] = previous_col.astype(object).where(previous_col.isna(), previous_col.astype(str))
+    return previous_df.assign(**conversions)
+
 def diff_dashboard_data(current_data, previous_data):
     """
     Calculate the difference between current and previous dashboard data.
@@ -150,7 +295,7 @@ def diff_dashboard_data(current_data, previous_data):
         # Convert to DataFrames for easier comparison
         try:
             current_df = pd.DataFrame(current_data[section])
-            previous_df = pd.DataFrame(previous_data[section])
+            previous_df = align_column_types(pd.DataFrame(previous_data[section]), current_df)
             
             # Identify primary key columns based on section
             if section == 'users':
@@ -167,61 +312,63 @@ def diff_dashboard_data(current_data, previous_data):
             
             # Find added records
             if not current_df.empty and not previous_df.empty:
-                # Create sets of tuples for comparison
-                current_keys = set(tuple(row) for row in current_df[key_cols].values)
-                previous_keys = set(tuple(row) for row in previous_df[key_cols].values)
+                # Unique keys on each side, used to tag rows via a merge indicator
+                current_keys = current_df[key_cols].drop_duplicates()
+                previous_keys = previous_df[key_cols].drop_duplicates()
                 
-                # Added records
-                added_keys = current_keys - previous_keys
-                if added_keys:
-                    added_mask = current_df[key_cols].apply(lambda row: tuple(row) in added_keys, axis=1)
+                # Added records (left merge keeps the row order of current_df)
+                added_mask = current_df[key_cols].merge(
+                    previous_keys, on=key_cols, how='left', indicator=True
+                )['_merge'].eq('left_only').to_numpy()
+                if added_mask.any():
                     diff['added'][section] = current_df[added_mask].to_dict('records')
                 
                 # Removed records
-                removed_keys = previous_keys - current_keys
-                if removed_keys:
-                    removed_mask = previous_df[key_cols].apply(lambda row: tuple(row) in removed_keys, axis=1)
+                removed_mask = previous_df[key_cols].merge(
+                    current_keys, on=key_cols, how='left', indicator=True
+                )['_merge'].eq('left_only').to_numpy()
+                if removed_mask.any():
                     diff['removed'][section] = previous_df[removed_mask].to_dict('records')
                 
-                # Changed records
-                common_keys = current_keys.intersection(previous_keys)
+                # Changed records: compare the first record for each common key
+                non_key_cols = [col for col in current_df.columns if col not in key_cols and col in previous_df.columns]
                 changed_records = []
                 
-                for key in common_keys:
-                    current_record = current_df[current_df[key_cols].apply(lambda row: tuple(row) == key, axis=1)]
-                    previous_record = previous_df[previous_df[key_cols].apply(lambda row: tuple(row) == key, axis=1)]
+                if non_key_cols:
+                    common = current_df.drop_duplicates(key_cols).merge(
+                        previous_df.drop_duplicates(key_cols)[key_cols + non_key_cols],
+                        on=key_cols,
+                        how='inner',
+                        suffixes=('', '_previous')
+                    )
                     
-                    # Compare non-key columns
-                    non_key_cols = [col for col in current_df.columns if col not in key_cols]
-                    
-                    for col in non_key_cols:
-                        # Get values safely
-                        current_val = current_record[col].values[0]
-                        previous_val = previous_record[col].values[0]
-                        
-                        # Handle pandas Series, arrays, and other complex types
+                    # One boolean column per compared field; a value missing on
+                    # both sides is not a change
+                    differences = np.empty((len(common), len(non_key_cols)), dtype=bool)
+                    for i, col in enumerate(non_key_cols):
+                        current_vals = common[col]
+                        previous_vals = common[f"{col}_previous"]
                         try:
-                            # For numpy arrays or pandas Series
-                            if hasattr(current_val, 'shape') and hasattr(previous_val, 'shape'):
-                                # Convert to list for comparison if they are arrays
-                                if hasattr(current_val, 'tolist') and hasattr(previous_val, 'tolist'):
-                                    is_different = current_val.tolist() != previous_val.tolist()
-                                else:
-                                    # Fall back to string comparison
-                                    is_different = str(current_val) != str(previous_val)
-                            else:
-                                # Direct comparison for simple types
-                                is_different = current_val != previous_val
+                            different = (current_vals != previous_vals).to_numpy(dtype=bool)
                         except Exception:
                             # If comparison fails, use string representation
-                            is_different = str(current_val) != str(previous_val)
+                            different = (current_vals.astype(str) != previous_vals.astype(str)).to_numpy(dtype=bool)
+                        both_missing = (current_vals.isna() & previous_vals.isna()).to_numpy(dtype=bool)
+                        differences[:, i] = different & ~both_missing
+                    
+                    changed_rows = np.flatnonzero(differences.any(axis=1))
+                    if len(changed_rows):
+                        # Report the first differing column for each changed record,
+                        # picking the column names and previous values with array indexing
+                        first_changed = differences[changed_rows].argmax(axis=1)
+                        changed_df = common.iloc[changed_rows]
+                        previous_values = changed_df[[f"{col}_previous" for col in non_key_cols]].to_numpy(dtype=object)
+                        previous_values = previous_values[np.arange(len(changed_rows)), first_changed]
                         
-                        if is_different:
-                            changed_record = current_record.copy()
-                            changed_record['_changed_column'] = col
-                            changed_record['_previous_value'] = str(previous_val)
-                            changed_records.append(changed_record.to_dict('records')[0])
-                            break
+                        changed_records = changed_df[current_df.columns].assign(
+                            _changed_column=np.asarray(non_key_cols, dtype=object)[first_changed],
+                            _previous_value=[str(value) for value in previous_values]
+                        ).to_dict('records')
                 
                 if changed_records:
                     diff['changed'][section] = changed_records
@@ -59,13 +59,15 @@ def test_data_processing():
     
     # Save the dashboard data to Parquet files
     parquet_paths = save_dashboard_data_to_parquet(dashboard_data, timestamp)
-    if parquet_paths:
+    if parquet_paths and logger.isEnabledFor(logging.INFO):
         logger.info(f"Test data saved to Parquet files: {', '.join(parquet_paths.values())}")
     
     # Update the cache with the test data
-    dashboard_cache.set_dashboard_data(dashboard_data)
-    dashboard_cache.set('test_mode', True)
-    dashboard_cache.set('test_timestamp', timestamp)
+    dashboard_cache.update({
+        'dashboard_data': dashboard_data,
+        'test_mode': True,
+        'test_timestamp': timestamp
+    })
     logger.info("Test data cached for quick access")
     
     return dashboard_data